@@ -1,6 +1,8 @@
 from django.contrib import admin
 
-from .models import Booking, Vehicle
+from .models import Booking, Change, RequestProfile, Vehicle
 
 admin.site.register(Vehicle)
 admin.site.register(Booking)
+admin.site.register(Change)
+admin.site.register(RequestProfile)
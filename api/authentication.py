@@ -0,0 +1,61 @@
+import hashlib
+
+from django.conf import settings
+from rest_framework.authentication import BaseAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .caching import LRUCache
+
+
+class TokenCache(LRUCache):
+    """
+    Bounded LRU cache of validated tokens keyed by a digest of the raw token.
+    Entries are dropped once the token's ``exp`` claim has passed.
+    """
+
+    def __init__(self, max_size):
+        super().__init__(max_size=max_size)
+
+    @staticmethod
+    def key_for(raw_token):
+        return hashlib.sha256(raw_token).digest()
+
+    def set(self, key, token):
+        expires_at = token.get("exp")
+        if expires_at is None:
+            return
+        super().set(key, token, expires_at=expires_at)
+
+
+token_cache = TokenCache(getattr(settings, "JWT_TOKEN_CACHE_SIZE", 1024))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that skips signature and claim verification for tokens
+    it has already validated, until they expire.
+    """
+
+    cache = token_cache
+
+    def get_validated_token(self, raw_token):
+        key = self.cache.key_for(raw_token)
+        token = self.cache.get(key)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            self.cache.set(key, token)
+        return token
+
+
+class ForwardedAuthentication(BaseAuthentication):
+    """
+    Authenticates every request as an already authenticated user, for
+    sub-requests made on that user's behalf.
+    """
+
+    def __init__(self, user, auth):
+        self.user = user
+        self.auth = auth
+
+    def authenticate(self, request):
+        return (self.user, self.auth)
@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe cache that evicts the least recently used entries once it
+    holds more than ``max_size`` entries or, when ``max_bytes`` is given,
+    values whose ``len()`` adds up to more than ``max_bytes``. Entries set
+    with ``expires_at`` are dropped once that Unix time has passed.
+    """
+
+    def __init__(self, max_size=None, max_bytes=None):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, _, expires_at = entry
+                if expires_at is None or expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def set(self, key, value, expires_at=None):
+        if self.max_size is not None and self.max_size <= 0:
+            return
+        size = len(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self.bytes += size
+            while self._over_limit():
+                self._remove(next(iter(self._entries)))
+
+    def _over_limit(self):
+        if self.max_size is not None and len(self._entries) > self.max_size:
+            return True
+        return self.max_bytes is not None and self.bytes > self.max_bytes
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class Subscriber:
+    __slots__ = ("user_id", "is_staff", "queue", "loop", "dropped")
+
+    def __init__(self, user, max_queue_size):
+        self.user_id = user.pk
+        self.is_staff = user.is_staff
+        self.queue = asyncio.Queue(maxsize=max_queue_size)
+        self.loop = asyncio.get_running_loop()
+        self.dropped = False
+
+
+class EventHub:
+    """
+    In-process pub/sub for server-sent events. Publishing is safe from any
+    thread; each subscriber has a bounded queue on its own event loop and is
+    dropped instead of buffering without limit when it falls behind.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, user):
+        subscriber = Subscriber(user, getattr(settings, "SSE_QUEUE_SIZE", 100))
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event, data, user_ids=None):
+        """
+        Send ``event`` to every subscriber, or only to the users in
+        ``user_ids`` and staff subscribers when it is given.
+        """
+        payload = json.dumps(data, cls=DjangoJSONEncoder)
+        message = f"event: {event}\ndata: {payload}\n\n".encode()
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            if user_ids is not None and not (
+                subscriber.user_id in user_ids or subscriber.is_staff
+            ):
+                continue
+            try:
+                subscriber.loop.call_soon_threadsafe(self._deliver, subscriber, message)
+            except RuntimeError:
+                # The subscriber's event loop has shut down.
+                self.unsubscribe(subscriber)
+
+    def _deliver(self, subscriber, message):
+        if subscriber.dropped:
+            return
+        try:
+            subscriber.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            subscriber.dropped = True
+            self.unsubscribe(subscriber)
+
+
+hub = EventHub()
+
+
+async def event_stream(user):
+    heartbeat = getattr(settings, "SSE_HEARTBEAT_SECONDS", 15)
+    subscriber = hub.subscribe(user)
+    try:
+        yield b"retry: 3000\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(subscriber.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                message = b": keepalive\n\n"
+            if subscriber.dropped:
+                yield b"event: dropped\ndata: {}\n\n"
+                return
+            yield message
+    finally:
+        hub.unsubscribe(subscriber)
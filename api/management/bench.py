@@ -0,0 +1,61 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+
+def start_server(server, host, port, quiet=True, timeout=30):
+    """
+    Start ``runserver`` or ``uvicorn`` on ``host:port`` with the current
+    settings module and return the process once it accepts connections.
+    """
+    if server == "uvicorn":
+        command = [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "sample_drf.asgi:application",
+            "--host",
+            host,
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ]
+    else:
+        command = [
+            sys.executable,
+            "manage.py",
+            "runserver",
+            f"{host}:{port}",
+            "--noreload",
+        ]
+    process = subprocess.Popen(
+        command,
+        cwd=settings.BASE_DIR,
+        # Serve with the settings, and so the database, the command uses.
+        env={**os.environ, "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE},
+        stdout=subprocess.DEVNULL if quiet else None,
+        stderr=subprocess.DEVNULL if quiet else None,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    process.wait()
+    raise CommandError(f"The {server} server did not start.")
+
+
+def percentile(values, percent):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
@@ -0,0 +1,64 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.authentication import CachedJWTAuthentication, TokenCache
+from api.views import BookingListCreateView
+
+
+class Command(BaseCommand):
+    help = "Measure JWT authentication cost per request on /bookings/ with and without the token cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+
+        with transaction.atomic():
+            user = User.objects.create_user(username="bench_auth_user")
+            token = str(RefreshToken.for_user(user).access_token)
+            factory = APIRequestFactory()
+
+            def make_request():
+                return factory.get("/bookings/", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+            cached = CachedJWTAuthentication()
+            cached.cache = TokenCache(max_size=1024)
+
+            for label, authenticator in (
+                ("uncached", JWTAuthentication()),
+                ("cached", cached),
+            ):
+                auth_us = self.time_authenticate(authenticator, make_request, iterations)
+                view_us = self.time_view(authenticator, make_request, iterations)
+                self.stdout.write(
+                    f"{label:>8}: authenticate {auth_us:8.2f} us/request, "
+                    f"GET /bookings/ {view_us:8.2f} us/request"
+                )
+
+            self.stdout.write(f"cache stats: {cached.cache.stats()}")
+            transaction.set_rollback(True)
+
+    def time_authenticate(self, authenticator, make_request, iterations):
+        view = BookingListCreateView()
+        requests = [view.initialize_request(make_request()) for _ in range(iterations)]
+        start = time.perf_counter()
+        for request in requests:
+            authenticator.authenticate(request)
+        return (time.perf_counter() - start) / iterations * 1e6
+
+    def time_view(self, authenticator, make_request, iterations):
+        view = BookingListCreateView.as_view(
+            authentication_classes=[lambda: authenticator], throttle_classes=[]
+        )
+        requests = [make_request() for _ in range(iterations)]
+        start = time.perf_counter()
+        for request in requests:
+            view(request)
+        return (time.perf_counter() - start) / iterations * 1e6
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import ScopedRateThrottle
+
+from api.throttling import SharedBucketStore, SharedScopedRateThrottle
+from api.views import LoginView
+
+
+class Command(BaseCommand):
+    help = "Measure the latency each throttle adds to a request"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20000)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        view = LoginView()
+        factory = APIRequestFactory()
+        requests = [
+            view.initialize_request(
+                factory.post("/login/", REMOTE_ADDR=f"10.0.{index // 256 % 256}.{index % 256}")
+            )
+            for index in range(iterations)
+        ]
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            THROTTLE_SHARED_FILE=os.path.join(directory, "bench.bin")
+        ):
+            store = SharedBucketStore(os.path.join(directory, "store.bin"))
+            start = time.perf_counter()
+            for index in range(iterations):
+                store.consume(f"bench:{index % 1000}", 1000000, 1000.0)
+            self.report("store.consume", start, iterations)
+
+            for label, throttle_class in (
+                ("shared token bucket", SharedScopedRateThrottle),
+                ("drf scoped (default cache)", ScopedRateThrottle),
+            ):
+                throttle = throttle_class()
+                start = time.perf_counter()
+                for request in requests:
+                    throttle.allow_request(request, view)
+                self.report(label, start, iterations)
+
+    def report(self, label, start, iterations):
+        elapsed_us = (time.perf_counter() - start) / iterations * 1e6
+        self.stdout.write(f"{label:>28}: {elapsed_us:8.2f} us/request")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from api.models import Change
+
+
+class Command(BaseCommand):
+    help = "Drop change log entries superseded by a later change to the same object"
+
+    def handle(self, *args, **options):
+        latest = (
+            Change.objects.values("model", "object_id")
+            .annotate(latest=Max("seq"))
+            .values("latest")
+        )
+        with transaction.atomic():
+            deleted, _ = Change.objects.exclude(seq__in=latest).delete()
+        self.stdout.write(f"Removed {deleted} superseded change(s).")
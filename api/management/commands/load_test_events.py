@@ -0,0 +1,194 @@
+import asyncio
+import http.client
+import json
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.management.bench import percentile, start_server
+from api.models import Vehicle
+from api.throttling import SharedScopedRateThrottle
+
+
+class Command(BaseCommand):
+    help = (
+        "Start a local uvicorn server, hold many /bookings/events/ streams open "
+        "and measure how long booking events take to reach every client. All "
+        "events are booked by one user, so --events is capped by the bookings "
+        "throttle; run with --settings sample_drf.bench_settings to lift it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=1000)
+        parser.add_argument("--events", type=int, default=20)
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+
+    def handle(self, *args, **options):
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            raise CommandError("The load test needs uvicorn: pip install uvicorn")
+        self.check_throttle(options["events"])
+
+        user = User.objects.create_user(username="sse_load_test_user")
+        vehicle = Vehicle.objects.create(
+            make="Load", model="Test", year=2024, plate="SSE-LOAD-TEST"
+        )
+        token = str(RefreshToken.for_user(user).access_token)
+        try:
+            server = start_server(
+                "uvicorn", options["host"], options["port"], quiet=False
+            )
+            try:
+                asyncio.run(self.run(options, token, vehicle, server.pid))
+            finally:
+                server.terminate()
+                server.wait()
+        finally:
+            vehicle.delete()
+            user.delete()
+
+    def check_throttle(self, events):
+        if not api_settings.DEFAULT_THROTTLE_CLASSES:
+            return
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get("bookings")
+        if rate is None:
+            return
+        num_requests, _ = SharedScopedRateThrottle().parse_rate(rate)
+        if events > num_requests:
+            raise CommandError(
+                f"--events {events} exceeds the bookings throttle of {rate}; "
+                "run with --settings sample_drf.bench_settings to disable it."
+            )
+
+    async def run(self, options, token, vehicle, server_pid):
+        host, port = options["host"], options["port"]
+        received = {}
+        rss_before = self.server_rss(server_pid)
+
+        start = time.perf_counter()
+        readers = await asyncio.gather(
+            *(
+                self.open_stream(host, port, token, received)
+                for _ in range(options["clients"])
+            )
+        )
+        connected = time.perf_counter() - start
+        rss_after = self.server_rss(server_pid)
+        self.stdout.write(
+            f"Opened {len(readers)} streams in {connected:.2f}s"
+            + (
+                f", server RSS +{(rss_after - rss_before) / 1024:.1f} MiB"
+                if rss_before and rss_after
+                else ""
+            )
+        )
+
+        sent = {}
+        for index in range(options["events"]):
+            booking_id, sent_at = await asyncio.to_thread(
+                self.create_booking, host, port, token, vehicle, index
+            )
+            sent[booking_id] = sent_at
+            received.setdefault(booking_id, [])
+            await asyncio.sleep(0.05)
+
+        deadline = time.perf_counter() + 10
+        while time.perf_counter() < deadline and any(
+            len(received[booking_id]) < len(readers) for booking_id in sent
+        ):
+            await asyncio.sleep(0.05)
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+
+        deliveries = [
+            (arrived - sent[booking_id]) * 1000
+            for booking_id in sent
+            for arrived in received[booking_id]
+        ]
+        fan_out = [
+            (max(received[booking_id]) - sent[booking_id]) * 1000
+            for booking_id in sent
+            if len(received[booking_id]) == len(readers)
+        ]
+        expected = len(sent) * len(readers)
+        self.stdout.write(f"Delivered {len(deliveries)}/{expected} events")
+        if deliveries:
+            self.stdout.write(
+                f"Delivery latency ms: p50 {percentile(deliveries, 50):.1f}, "
+                f"p99 {percentile(deliveries, 99):.1f}"
+            )
+        if fan_out:
+            self.stdout.write(
+                f"Time to reach all clients ms: mean {statistics.mean(fan_out):.1f}, "
+                f"max {max(fan_out):.1f}"
+            )
+
+    async def open_stream(self, host, port, token, received):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(
+            (
+                f"GET /bookings/events/ HTTP/1.1\r\nHost: {host}\r\n"
+                f"Authorization: Bearer {token}\r\nAccept: text/event-stream\r\n\r\n"
+            ).encode()
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        if b" 200 " not in status_line:
+            raise CommandError(f"Stream refused: {status_line.decode().strip()}")
+        await reader.readuntil(b"\r\n\r\n")
+        return asyncio.create_task(self.read_events(reader, writer, received))
+
+    async def read_events(self, reader, writer, received):
+        event = None
+        try:
+            while line := await reader.readline():
+                if line.startswith(b"event: "):
+                    event = line[7:].strip()
+                elif line.startswith(b"data: ") and event == b"booking.created":
+                    booking_id = json.loads(line[6:])["id"]
+                    received.setdefault(booking_id, []).append(time.perf_counter())
+        finally:
+            writer.close()
+
+    def create_booking(self, host, port, token, vehicle, index):
+        start = timezone.now() + timedelta(days=index)
+        body = json.dumps(
+            {
+                "vehicle": vehicle.pk,
+                "start_datetime": start.isoformat(),
+                "end_datetime": (start + timedelta(hours=1)).isoformat(),
+            }
+        )
+        connection = http.client.HTTPConnection(host, port)
+        sent_at = time.perf_counter()
+        connection.request(
+            "POST",
+            "/bookings/",
+            body,
+            {"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+        )
+        response = connection.getresponse()
+        if response.status != 201:
+            raise CommandError(f"Booking failed with status {response.status}")
+        booking_id = json.loads(response.read())["id"]
+        connection.close()
+        return booking_id, sent_at
+
+    def server_rss(self, pid):
+        try:
+            with open(f"/proc/{pid}/status") as status_file:
+                for line in status_file:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        except OSError:
+            return None
+        return None
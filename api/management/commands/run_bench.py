@@ -0,0 +1,292 @@
+import http.client
+import json
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.management.bench import percentile, start_server
+from api.models import RequestProfile, Vehicle
+
+from .seed_bench import BENCH_PASSWORD
+
+# Routes that cannot be measured as request/response round trips.
+SKIPPED_ROUTES = {"booking-events": "long-lived event stream"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Load every route in api/urls.py with concurrent clients against a local "
+        "server and write throughput, latency percentiles and queries per request "
+        "as JSON. Run with --settings sample_drf.bench_settings after seed_bench."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--server", choices=["runserver", "uvicorn"], default="runserver"
+        )
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8766)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--output", default="bench_results.json")
+        parser.add_argument(
+            "--routes", nargs="+", help="Only load these route names"
+        )
+
+    def handle(self, *args, **options):
+        self.host = options["host"]
+        self.port = options["port"]
+        self.run_id = time.time_ns()
+        self.unique = 0
+        self.unique_lock = threading.Lock()
+        self.prepare_data()
+        scenarios = self.scenarios()
+        if options["routes"]:
+            unknown = set(options["routes"]) - set(scenarios)
+            if unknown:
+                raise CommandError(f"Unknown routes: {', '.join(sorted(unknown))}")
+            scenarios = {name: scenarios[name] for name in options["routes"]}
+
+        server = start_server(options["server"], self.host, self.port)
+        try:
+            routes = {}
+            for name, scenario in scenarios.items():
+                if scenario is None:
+                    reason = SKIPPED_ROUTES.get(name, "no data to request")
+                    routes[name] = {"skipped": reason}
+                    continue
+                result = self.load(
+                    scenario, options["concurrency"], options["requests"]
+                )
+                result["queries_per_request"] = self.count_queries(scenario)
+                routes[name] = result
+                self.report(name, result)
+        finally:
+            server.terminate()
+            server.wait()
+
+        results = {
+            "created_at": timezone.now().isoformat(),
+            "settings": settings.SETTINGS_MODULE,
+            "server": options["server"],
+            "concurrency": options["concurrency"],
+            "requests_per_route": options["requests"],
+            "routes": routes,
+        }
+        with open(options["output"], "w") as output:
+            json.dump(results, output, indent=2)
+        self.stdout.write(f"Wrote {options['output']}")
+
+    def prepare_data(self):
+        self.admin, _ = User.objects.get_or_create(
+            username="bench_0", defaults={"is_staff": True}
+        )
+        if not self.admin.is_staff:
+            raise CommandError("bench_0 must be a staff user; run seed_bench first.")
+        self.user = (
+            User.objects.filter(username__startswith="bench_", is_staff=False)
+            .order_by("pk")
+            .first()
+        )
+        if self.user is None:
+            self.user = User.objects.create_user(
+                username="bench_1", password=BENCH_PASSWORD
+            )
+        self.vehicle = Vehicle.objects.order_by("pk").first()
+        if self.vehicle is None:
+            self.vehicle = Vehicle.objects.create(
+                make="Toyota", model="Corolla", year=2024, plate="BENCH-RUN"
+            )
+        self.admin_token = str(RefreshToken.for_user(self.admin).access_token)
+        self.user_token = str(RefreshToken.for_user(self.user).access_token)
+        self.refresh_token = str(RefreshToken.for_user(self.user))
+        self.allocation_start = timezone.now() + timedelta(days=7300)
+
+    def next_unique(self):
+        with self.unique_lock:
+            self.unique += 1
+            return self.unique
+
+    def booking_body(self):
+        start = timezone.now() + timedelta(days=3650, hours=self.next_unique())
+        return {
+            "vehicle": self.vehicle.pk,
+            "start_datetime": start.isoformat(),
+            "end_datetime": (start + timedelta(hours=1)).isoformat(),
+        }
+
+    def allocation_body(self):
+        # Every request asks for the same window so allocations compete.
+        return {
+            "make": self.vehicle.make,
+            "start_datetime": self.allocation_start.isoformat(),
+            "end_datetime": (self.allocation_start + timedelta(minutes=1)).isoformat(),
+        }
+
+    def scenarios(self):
+        """
+        One request recipe per named route in api/urls.py: method, path, token
+        and a callable building the JSON body.
+        """
+        profile = RequestProfile.objects.defer("queries", "stats").first()
+        known = {
+            "vehicle-list": ("GET", "/vehicles/", self.admin_token, None),
+            "vehicle-detail": (
+                "GET",
+                f"/vehicles/{self.vehicle.pk}/",
+                self.admin_token,
+                None,
+            ),
+            "booking-list-create": ("GET", "/bookings/", self.user_token, None),
+            "booking-allocate": (
+                "POST",
+                "/bookings/allocate/",
+                self.user_token,
+                self.allocation_body,
+            ),
+            "change-feed": ("GET", "/changes/", self.user_token, None),
+            "profile-list": ("GET", "/profiles/", self.admin_token, None),
+            "profile-detail": profile
+            and ("GET", f"/profiles/{profile.pk}/", self.admin_token, None),
+            "profile-download": profile
+            and (
+                "GET",
+                f"/profiles/{profile.pk}/download/",
+                self.admin_token,
+                None,
+            ),
+            "register": (
+                "POST",
+                "/register/",
+                None,
+                lambda: {
+                    "username": f"bench_register_{self.run_id}_{self.next_unique()}",
+                    "email": "register@example.com",
+                    "password": BENCH_PASSWORD,
+                },
+            ),
+            "login": (
+                "POST",
+                "/login/",
+                None,
+                lambda: {"username": self.user.username, "password": BENCH_PASSWORD},
+            ),
+            "token_refresh": (
+                "POST",
+                "/refresh/",
+                None,
+                lambda: {"refresh": self.refresh_token},
+            ),
+            "batch": (
+                "POST",
+                "/batch/",
+                self.user_token,
+                lambda: {
+                    "operations": [
+                        {"method": "GET", "path": "/bookings/"},
+                        {"method": "GET", "path": "/changes/"},
+                    ]
+                },
+            ),
+        }
+        scenarios = {}
+        for pattern in get_resolver("api.urls").url_patterns:
+            scenarios[pattern.name] = known.get(pattern.name)
+        scenarios["booking-create"] = (
+            "POST",
+            "/bookings/",
+            self.user_token,
+            self.booking_body,
+        )
+        return scenarios
+
+    def load(self, scenario, concurrency, total):
+        method, path, token, body = scenario
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        per_client = [total // concurrency] * concurrency
+        for index in range(total % concurrency):
+            per_client[index] += 1
+
+        def client(count):
+            latencies = []
+            statuses = Counter()
+            conn = http.client.HTTPConnection(self.host, self.port)
+            for _ in range(count):
+                payload = json.dumps(body()) if body else None
+                start = time.perf_counter()
+                try:
+                    conn.request(method, path, payload, headers)
+                    response = conn.getresponse()
+                    response.read()
+                except (OSError, http.client.HTTPException):
+                    statuses["error"] += 1
+                    conn.close()
+                    conn = http.client.HTTPConnection(self.host, self.port)
+                    continue
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[response.status] += 1
+            conn.close()
+            return latencies, statuses
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(client, per_client))
+        elapsed = time.perf_counter() - start
+
+        latencies = [
+            round(ms, 2) for client_latencies, _ in outcomes for ms in client_latencies
+        ]
+        statuses = sum((client_statuses for _, client_statuses in outcomes), Counter())
+        return {
+            "method": method,
+            "path": path,
+            "requests": total,
+            "status_codes": {str(code): count for code, count in statuses.items()},
+            "throughput_rps": round(len(latencies) / elapsed, 1),
+            "latency_ms": {
+                "mean": round(statistics.mean(latencies), 2) if latencies else None,
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+            },
+        }
+
+    def count_queries(self, scenario):
+        # Measured in-process; reads that /batch/ runs on worker threads use
+        # their own connections and are not counted.
+        method, path, token, body = scenario
+        client = APIClient(HTTP_HOST=self.host)
+        if token:
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        with CaptureQueriesContext(connection) as queries:
+            client.generic(
+                method,
+                path,
+                json.dumps(body()) if body else "",
+                content_type="application/json",
+            )
+        return len(queries)
+
+    def report(self, name, result):
+        latency = result["latency_ms"]
+        self.stdout.write(
+            f"{name:>20}: {result['throughput_rps']:8.1f} req/s  "
+            f"p50 {latency['p50']} ms  p95 {latency['p95']} ms  "
+            f"p99 {latency['p99']} ms  {result['queries_per_request']} queries  "
+            f"{result['status_codes']}"
+        )
@@ -0,0 +1,191 @@
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import Booking, Change, Vehicle
+from api.serializers import BookingSerializer, VehicleSerializer
+
+BENCH_PASSWORD = "benchpass123"
+
+# Rough share of a rental fleet per make, with common models for each.
+FLEET = [
+    ("Toyota", ["Corolla", "Camry", "RAV4", "Yaris", "Prius"], 24),
+    ("Honda", ["Civic", "Accord", "CR-V", "Fit"], 14),
+    ("Ford", ["Focus", "Fiesta", "Escape", "Mustang"], 12),
+    ("Hyundai", ["Elantra", "Tucson", "i20"], 10),
+    ("Volkswagen", ["Golf", "Polo", "Passat", "Tiguan"], 10),
+    ("Nissan", ["Altima", "Sentra", "Qashqai"], 8),
+    ("Kia", ["Rio", "Sportage", "Ceed"], 8),
+    ("Chevrolet", ["Malibu", "Spark", "Equinox"], 6),
+    ("BMW", ["3 Series", "X1", "X3"], 4),
+    ("Tesla", ["Model 3", "Model Y"], 4),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate users, vehicles and bookings for load benchmarks. Run with "
+        "--settings sample_drf.bench_settings to keep them out of db.sqlite3."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100000)
+        parser.add_argument("--vehicles", type=int, default=10000)
+        parser.add_argument("--bookings", type=int, default=1000000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--start",
+            type=date.fromisoformat,
+            default=date(2025, 1, 1),
+            help="Date the generated bookings begin from; also anchors model years",
+        )
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith="bench_").exists():
+            raise CommandError(
+                "Benchmark data already exists; run flush on this database first."
+            )
+
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        # A fixed date rather than the clock, so a seed always yields the same rows.
+        self.start = timezone.make_aware(
+            datetime.combine(options["start"], datetime.min.time())
+        )
+
+        user_ids = self.timed("users", self.create_users, options["users"])
+        vehicle_ids = self.timed("vehicles", self.create_vehicles, options["vehicles"])
+        self.timed(
+            "bookings",
+            self.create_bookings,
+            options["bookings"],
+            user_ids,
+            vehicle_ids,
+        )
+
+    def timed(self, label, create, count, *args):
+        start = time.perf_counter()
+        result = create(count, *args)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"Created {count} {label} in {elapsed:.1f}s")
+        return result
+
+    def insert(self, model, rows, change=None):
+        """
+        Bulk-create ``rows`` in batches, with the ``Change`` row that
+        ``change`` builds for each one so the change feed matches the data.
+        """
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                self.flush(model, batch, change)
+                batch = []
+        if batch:
+            self.flush(model, batch, change)
+
+    def flush(self, model, batch, change):
+        with transaction.atomic():
+            model.objects.bulk_create(batch)
+            if change is not None:
+                Change.objects.bulk_create(change(row) for row in batch)
+
+    def create_users(self, count):
+        # Hashing is deliberately slow, so every bench user shares one hash.
+        password = make_password(BENCH_PASSWORD)
+        self.insert(
+            User,
+            (
+                User(
+                    username=f"bench_{index}",
+                    email=f"bench_{index}@example.com",
+                    password=password,
+                    is_staff=index == 0,
+                )
+                for index in range(count)
+            ),
+        )
+        return list(
+            User.objects.filter(username__startswith="bench_")
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+    def create_vehicles(self, count):
+        makes = [make for make, _, _ in FLEET]
+        weights = [weight for _, _, weight in FLEET]
+        models = {make: names for make, names, _ in FLEET}
+        year = self.start.year
+
+        def vehicles():
+            for index in range(count):
+                make = self.rng.choices(makes, weights)[0]
+                yield Vehicle(
+                    make=make,
+                    model=self.rng.choice(models[make]),
+                    # Fleets skew towards the last few model years.
+                    year=int(self.rng.triangular(year - 12, year + 1, year)),
+                    plate=f"BENCH-{index:07d}",
+                )
+
+        serializer = VehicleSerializer()
+        self.insert(
+            Vehicle,
+            vehicles(),
+            lambda vehicle: Change(
+                model=Change.VEHICLE,
+                object_id=vehicle.pk,
+                action=Change.CREATE,
+                data=serializer.to_representation(vehicle),
+            ),
+        )
+        return list(
+            Vehicle.objects.filter(plate__startswith="BENCH-")
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+    def create_bookings(self, count, user_ids, vehicle_ids):
+        # A few users book far more often than the rest, and some cars are
+        # more popular; each car's bookings follow one another without overlap.
+        user_weights = [self.rng.paretovariate(1.2) for _ in user_ids]
+        vehicle_weights = [self.rng.paretovariate(2.5) for _ in vehicle_ids]
+        next_free = [self.start] * len(vehicle_ids)
+        users = self.rng.choices(user_ids, user_weights, k=count)
+        vehicles = self.rng.choices(range(len(vehicle_ids)), vehicle_weights, k=count)
+
+        def bookings():
+            for user_id, vehicle_index in zip(users, vehicles):
+                gap = timedelta(hours=self.rng.expovariate(1 / 24))
+                duration = timedelta(
+                    hours=max(1, round(self.rng.lognormvariate(2.5, 1.0)))
+                )
+                start = next_free[vehicle_index] + gap
+                next_free[vehicle_index] = start + duration
+                yield Booking(
+                    user_id=user_id,
+                    vehicle_id=vehicle_ids[vehicle_index],
+                    start_datetime=start,
+                    end_datetime=start + duration,
+                )
+
+        # One serializer for every row; building its fields per row dominates.
+        serializer = BookingSerializer()
+        self.insert(
+            Booking,
+            bookings(),
+            lambda booking: Change(
+                model=Change.BOOKING,
+                object_id=booking.pk,
+                action=Change.CREATE,
+                user_id=booking.user_id,
+                data=serializer.to_representation(booking),
+            ),
+        )
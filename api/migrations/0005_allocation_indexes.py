@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_requestprofile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['vehicle', 'start_datetime', 'end_datetime'], name='api_booking_vehicle_096ec1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['make', 'model', 'year'], name='api_vehicle_make_7b19de_idx'),
+        ),
+    ]
@@ -8,6 +8,9 @@ class Vehicle(models.Model):
     year = models.PositiveIntegerField()
     plate = models.CharField(max_length=20, unique=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["make", "model", "year"])]
+
     def __str__(self):
         return f"{self.make} {self.model} ({self.plate})"
 
@@ -20,5 +23,65 @@ class Booking(models.Model):
     start_datetime = models.DateTimeField()
     end_datetime = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["vehicle", "start_datetime", "end_datetime"])
+        ]
+
     def __str__(self):
         return f"Booking for {self.vehicle} by {self.user} from {self.start_datetime} to {self.end_datetime}"
+
+
+class Change(models.Model):
+    VEHICLE = "vehicle"
+    BOOKING = "booking"
+    MODEL_CHOICES = [(VEHICLE, "Vehicle"), (BOOKING, "Booking")]
+
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+    ACTION_CHOICES = [(CREATE, "Create"), (UPDATE, "Update"), (DELETE, "Delete")]
+
+    seq = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # Owner of a booking change; kept without a constraint so tombstones
+    # survive the user being deleted.
+    user = models.ForeignKey(
+        User,
+        null=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+    )
+    data = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["seq"]
+        indexes = [
+            models.Index(fields=["user", "seq"]),
+            models.Index(fields=["model", "object_id"]),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.action} {self.model} {self.object_id}"
+
+
+class RequestProfile(models.Model):
+    created_at = models.DateTimeField(auto_now_add=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2000)
+    route = models.CharField(max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    queries = models.JSONField(default=list)
+    stats = models.BinaryField()
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.1f} ms)"
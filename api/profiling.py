@@ -0,0 +1,118 @@
+import cProfile
+import marshal
+import pstats
+import random
+import time
+
+from asgiref.sync import (
+    async_to_sync,
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.db import connection
+from rest_framework.exceptions import APIException
+
+from .authentication import CachedJWTAuthentication
+from .models import RequestProfile
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                {"sql": sql, "time_ms": (time.perf_counter() - start) * 1000}
+            )
+
+
+class ProfilingMiddleware:
+    """
+    Runs a request under cProfile when a staff user sends ``X-Profile: 1`` or
+    when it is picked by ``PROFILE_SAMPLE_RATE``, and stores the stats along
+    with the route, SQL queries and timings as a ``RequestProfile``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "PROFILE_SAMPLE_RATE", 0)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.sample_rate and "HTTP_X_PROFILE" not in request.META:
+            return self.get_response(request)
+        return self.process(request, self.get_response)
+
+    async def __acall__(self, request):
+        if not self.sample_rate and "HTTP_X_PROFILE" not in request.META:
+            return await self.get_response(request)
+        # Sync views run on the thread-sensitive executor thread, so profile
+        # there for cProfile and the query wrapper to see their work.
+        return await sync_to_async(self.process)(
+            request, async_to_sync(self.get_response)
+        )
+
+    def process(self, request, get_response):
+        if not self.should_profile(request):
+            return get_response(request)
+        return self.profile(request, get_response)
+
+    def should_profile(self, request):
+        if request.META.get("HTTP_X_PROFILE") == "1":
+            try:
+                result = CachedJWTAuthentication().authenticate(request)
+            except APIException:
+                result = None
+            if result is not None and result[0].is_staff:
+                return True
+        return random.random() < self.sample_rate
+
+    def profile(self, request, get_response):
+        profiler = cProfile.Profile()
+        recorder = QueryRecorder()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this thread.
+            return get_response(request)
+
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(recorder):
+                response = get_response(request)
+        finally:
+            profiler.disable()
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        match = request.resolver_match
+        profile = RequestProfile.objects.create(
+            method=request.method,
+            path=request.get_full_path(),
+            route=match.route if match else "",
+            status_code=response.status_code,
+            duration_ms=duration_ms,
+            query_count=len(recorder.queries),
+            queries=recorder.queries,
+            stats=marshal.dumps(pstats.Stats(profiler).stats),
+        )
+        self.prune()
+        response["X-Profile-Id"] = str(profile.pk)
+        return response
+
+    def prune(self):
+        keep = getattr(settings, "PROFILE_MAX_STORED", 100)
+        stale = RequestProfile.objects.values_list("pk", flat=True)[keep:]
+        RequestProfile.objects.filter(pk__in=list(stale)).delete()
@@ -1,8 +1,9 @@
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from rest_framework import serializers
 
-from .models import Booking, Vehicle
+from .models import Booking, Change, RequestProfile, Vehicle
 
 
 class VehicleSerializer(serializers.ModelSerializer):
@@ -23,6 +24,20 @@ class BookingSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("End time must be after start time.")
         return data
 
+
+class AllocationSerializer(serializers.Serializer):
+    make = serializers.CharField(required=False)
+    model = serializers.CharField(required=False)
+    year = serializers.IntegerField(required=False)
+    start_datetime = serializers.DateTimeField()
+    end_datetime = serializers.DateTimeField()
+
+    def validate(self, data):
+        if data["end_datetime"] <= data["start_datetime"]:
+            raise serializers.ValidationError("End time must be after start time.")
+        return data
+
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
 
@@ -41,3 +56,47 @@ class RegisterSerializer(serializers.ModelSerializer):
             password=validated_data["password"],
         )
         return user
+
+
+class BatchOperationSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=["GET", "POST", "PUT", "DELETE"])
+    path = serializers.RegexField(r"^/", max_length=2000)
+    body = serializers.JSONField(required=False, default=dict)
+
+
+class BatchSerializer(serializers.Serializer):
+    operations = serializers.ListField(
+        child=BatchOperationSerializer(), allow_empty=False
+    )
+    atomic = serializers.BooleanField(default=False)
+
+    def validate_operations(self, value):
+        limit = getattr(settings, "BATCH_MAX_OPERATIONS", 20)
+        if len(value) > limit:
+            raise serializers.ValidationError(
+                f"A batch can contain at most {limit} operations."
+            )
+        return value
+
+
+class ChangeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Change
+        fields = ["seq", "model", "object_id", "action", "data"]
+
+
+class ChangeQuerySerializer(serializers.Serializer):
+    since = serializers.IntegerField(min_value=0, default=0)
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=100)
+
+
+class RequestProfileSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RequestProfile
+        exclude = ["queries", "stats"]
+
+
+class RequestProfileDetailSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RequestProfile
+        exclude = ["stats"]
@@ -0,0 +1,94 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .events import hub
+from .models import Booking, Change, Vehicle
+from .serializers import BookingSerializer, VehicleSerializer
+
+
+@receiver(post_save, sender=Vehicle)
+def record_vehicle_save(sender, instance, created, **kwargs):
+    Change.objects.create(
+        model=Change.VEHICLE,
+        object_id=instance.pk,
+        action=Change.CREATE if created else Change.UPDATE,
+        data=VehicleSerializer(instance).data,
+    )
+
+
+@receiver(pre_delete, sender=Vehicle)
+def collect_vehicle_booking_owners(sender, instance, **kwargs):
+    instance._booking_owners = set(
+        instance.bookings.values_list("user_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Vehicle)
+def record_vehicle_delete(sender, instance, **kwargs):
+    Change.objects.create(
+        model=Change.VEHICLE, object_id=instance.pk, action=Change.DELETE
+    )
+    # One event replaces the per-booking events of the cascade, and only
+    # owners of the removed bookings and staff receive it.
+    transaction.on_commit(
+        partial(
+            hub.publish,
+            "vehicle.deleted",
+            {"vehicle": instance.pk},
+            user_ids=getattr(instance, "_booking_owners", set()),
+        )
+    )
+
+
+def publish_booking_event(event, booking, data):
+    user_ids = {booking.user_id}
+    transaction.on_commit(
+        partial(hub.publish, f"booking.{event}", data, user_ids=user_ids)
+    )
+    transaction.on_commit(
+        partial(
+            hub.publish,
+            "vehicle.availability",
+            {
+                "vehicle": booking.vehicle_id,
+                "start_datetime": booking.start_datetime,
+                "end_datetime": booking.end_datetime,
+                "available": event == "deleted",
+            },
+            user_ids=user_ids,
+        )
+    )
+
+
+@receiver(post_save, sender=Booking)
+def record_booking_save(sender, instance, created, **kwargs):
+    data = BookingSerializer(instance).data
+    Change.objects.create(
+        model=Change.BOOKING,
+        object_id=instance.pk,
+        action=Change.CREATE if created else Change.UPDATE,
+        user_id=instance.user_id,
+        data=data,
+    )
+    if created:
+        publish_booking_event("created", instance, data)
+
+
+# Also fires for bookings removed by a cascading vehicle or user delete.
+@receiver(post_delete, sender=Booking)
+def record_booking_delete(sender, instance, origin=None, **kwargs):
+    Change.objects.create(
+        model=Change.BOOKING,
+        object_id=instance.pk,
+        action=Change.DELETE,
+        user_id=instance.user_id,
+    )
+    # ``origin`` is the instance or queryset the delete started from.
+    if isinstance(origin, Vehicle) or getattr(origin, "model", None) is Vehicle:
+        return
+    publish_booking_event(
+        "deleted", instance, {"id": instance.pk, "user": instance.user_id}
+    )
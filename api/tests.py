@@ -1,10 +1,61 @@
+import asyncio
+import multiprocessing
+import os
+import pstats
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from django.test import override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
-from rest_framework.test import APIClient, APITestCase
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from .models import Booking, Vehicle
+from .authentication import CachedJWTAuthentication, TokenCache
+from .caching import LRUCache
+from .events import hub
+from .models import Booking, Change, RequestProfile, Vehicle
+from .throttling import SharedBucketStore, SharedScopedRateThrottle, get_bucket_store
+from .views import BookingAllocateView, BookingListCreateView
+
+throttle_dir = tempfile.TemporaryDirectory()
+# Throttling is switched off except in SharedScopedRateThrottleTest, so tests
+# do not drain each other's buckets in the shared file.
+throttled = settings.REST_FRAMEWORK
+throttle_settings = override_settings(
+    THROTTLE_SHARED_FILE=os.path.join(throttle_dir.name, "throttle.bin"),
+    REST_FRAMEWORK={
+        **throttled,
+        "DEFAULT_THROTTLE_RATES": dict.fromkeys(throttled["DEFAULT_THROTTLE_RATES"]),
+    },
+)
+
+
+def setUpModule():
+    throttle_settings.enable()
+
+
+def tearDownModule():
+    throttle_settings.disable()
+    throttle_dir.cleanup()
+
+
+def consume_tokens(path, attempts, results):
+    store = SharedBucketStore(path, slots=64)
+    allowed = 0
+    for _ in range(attempts):
+        if store.consume("shared", capacity=100, refill_rate=0)[0]:
+            allowed += 1
+    results.put(allowed)
 
 
 class VehicleViewTest(APITestCase):
@@ -239,8 +290,8 @@ class BookingListCreateViewTest(APITestCase):
         response = self.client.get("/bookings/")
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["vehicle"], self.vehicle.pk)
+        self.assertEqual(len(response.json()), 1)
+        self.assertEqual(response.json()[0]["vehicle"], self.vehicle.pk)
 
     def test_get_bookings_different_user(self):
         """Test that user only sees their own bookings"""
@@ -251,7 +302,7 @@ class BookingListCreateViewTest(APITestCase):
         response = self.client.get("/bookings/")
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0)  # user2 has no bookings
+        self.assertEqual(len(response.json()), 0)  # user2 has no bookings
 
     def test_get_bookings_unauthenticated(self):
         """Test retrieving bookings without authentication"""
@@ -434,3 +485,938 @@ class TokenRefreshViewTest(APITestCase):
         response = self.client.post("/refresh/", data)
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CachedJWTAuthenticationTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="testpass123"
+        )
+        self.cache = CachedJWTAuthentication.cache
+        self.cache.clear()
+        self.client = APIClient()
+
+    def tearDown(self):
+        self.cache.clear()
+
+    def test_repeated_token_is_served_from_cache(self):
+        """Test that a reused access token is only validated once"""
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+        self.client.get("/bookings/")
+        response = self.client.get("/bookings/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = self.cache.stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["size"], 1)
+
+    def test_invalid_token_is_not_cached(self):
+        """Test that invalid tokens are rejected and never cached"""
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer invalid_token")
+
+        response = self.client.get("/bookings/")
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_expired_entry_is_evicted(self):
+        """Test that a cached token is dropped once its exp has passed"""
+        token = RefreshToken.for_user(self.user).access_token
+        key = TokenCache.key_for(b"token")
+        token["exp"] = int(time.time()) - 1
+        self.cache.set(key, token)
+
+        self.assertIsNone(self.cache.get(key))
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_cache_is_bounded(self):
+        """Test that the least recently used entry is evicted at capacity"""
+        cache = TokenCache(max_size=2)
+        tokens = [RefreshToken.for_user(self.user).access_token for _ in range(3)]
+        for index, token in enumerate(tokens):
+            cache.set(TokenCache.key_for(str(index).encode()), token)
+
+        self.assertEqual(cache.stats()["size"], 2)
+        self.assertIsNone(cache.get(TokenCache.key_for(b"0")))
+        self.assertIsNotNone(cache.get(TokenCache.key_for(b"2")))
+
+
+@override_settings(BATCH_MAX_WORKERS=1)
+class BatchViewTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="testpass123"
+        )
+        self.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="adminpass123",
+            is_staff=True,
+        )
+        self.vehicle = Vehicle.objects.create(
+            make="Toyota", model="Camry", year=2022, plate="ABC-123"
+        )
+        self.client = APIClient()
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def test_batch_returns_results_in_order(self):
+        """Test that each operation's status and body are returned in order"""
+        data = {
+            "operations": [
+                {
+                    "method": "POST",
+                    "path": "/bookings/",
+                    "body": {
+                        "vehicle": self.vehicle.pk,
+                        "start_datetime": "2023-12-10T00:00:00Z",
+                        "end_datetime": "2023-12-15T00:00:00Z",
+                    },
+                },
+                {"method": "GET", "path": "/bookings/"},
+                {"method": "GET", "path": f"/vehicles/{self.vehicle.pk}/"},
+            ]
+        }
+
+        response = self.client.post("/batch/", data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result["status"] for result in response.data],
+            [
+                status.HTTP_201_CREATED,
+                status.HTTP_200_OK,
+                status.HTTP_403_FORBIDDEN,
+            ],
+        )
+        self.assertEqual(response.data[0]["body"]["user"], self.user.pk)
+        self.assertEqual(len(response.data[1]["body"]), 1)
+
+    def test_batch_unknown_path(self):
+        """Test that operations on unknown routes report 404"""
+        data = {"operations": [{"method": "GET", "path": "/unknown/"}]}
+
+        response = self.client.post("/batch/", data, format="json")
+
+        self.assertEqual(response.data[0]["status"], status.HTTP_404_NOT_FOUND)
+
+    @override_settings(BATCH_MAX_OPERATIONS=2)
+    def test_batch_operation_limit(self):
+        """Test that batches longer than BATCH_MAX_OPERATIONS are rejected"""
+        data = {"operations": [{"method": "GET", "path": "/bookings/"}] * 3}
+
+        response = self.client.post("/batch/", data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("operations", response.data)
+
+    def test_batch_cannot_be_nested(self):
+        """Test that a batch cannot contain another batch"""
+        data = {"operations": [{"method": "POST", "path": "/batch/"}]}
+
+        response = self.client.post("/batch/", data, format="json")
+
+        self.assertEqual(response.data[0]["status"], status.HTTP_400_BAD_REQUEST)
+
+    def test_atomic_batch_rolls_back_on_failure(self):
+        """Test that an atomic batch undoes earlier writes when one fails"""
+        data = {
+            "atomic": True,
+            "operations": [
+                {
+                    "method": "POST",
+                    "path": "/bookings/",
+                    "body": {
+                        "vehicle": self.vehicle.pk,
+                        "start_datetime": "2023-12-10T00:00:00Z",
+                        "end_datetime": "2023-12-15T00:00:00Z",
+                    },
+                },
+                {"method": "POST", "path": "/bookings/", "body": {}},
+                {"method": "GET", "path": "/bookings/"},
+            ],
+        }
+
+        response = self.client.post("/batch/", data, format="json")
+
+        self.assertEqual(
+            [result["status"] for result in response.data],
+            [
+                status.HTTP_201_CREATED,
+                status.HTTP_400_BAD_REQUEST,
+                status.HTTP_424_FAILED_DEPENDENCY,
+            ],
+        )
+        self.assertEqual(Booking.objects.count(), 0)
+
+    def test_batch_invalid_data(self):
+        """Test batch with no operations"""
+        response = self.client.post("/batch/", {"operations": []}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_unauthenticated(self):
+        """Test batch without authentication"""
+        self.client.credentials()
+        data = {"operations": [{"method": "GET", "path": "/bookings/"}]}
+
+        response = self.client.post("/batch/", data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class BatchViewConcurrencyTest(APITransactionTestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="adminpass123",
+            is_staff=True,
+        )
+        self.vehicles = [
+            Vehicle.objects.create(
+                make="Toyota", model="Camry", year=2022, plate=f"ABC-{index}"
+            )
+            for index in range(4)
+        ]
+        self.client = APIClient()
+        refresh = RefreshToken.for_user(self.admin_user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def test_concurrent_gets(self):
+        """Test that parallel GETs each return their own vehicle"""
+        data = {
+            "operations": [
+                {"method": "GET", "path": f"/vehicles/{vehicle.pk}/"}
+                for vehicle in self.vehicles
+            ]
+        }
+
+        response = self.client.post("/batch/", data, format="json")
+
+        self.assertEqual(
+            [result["body"]["plate"] for result in response.data],
+            [vehicle.plate for vehicle in self.vehicles],
+        )
+
+
+@override_settings(REST_FRAMEWORK=throttled)
+class SharedScopedRateThrottleTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="testpass123"
+        )
+        get_bucket_store().reset()
+        self.client = APIClient()
+
+    def tearDown(self):
+        get_bucket_store().reset()
+
+    @mock.patch.object(SharedScopedRateThrottle, "timer", return_value=1000.0)
+    def test_login_is_throttled_per_ip(self, timer):
+        """Test that login requests beyond the scope's rate are rejected"""
+        data = {"username": "testuser", "password": "wrongpassword"}
+
+        for _ in range(20):
+            response = self.client.post("/login/", data)
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post("/login/", data)
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Retry-After", response)
+
+    @mock.patch.object(SharedScopedRateThrottle, "timer", return_value=1000.0)
+    def test_buckets_are_separate_per_client(self, timer):
+        """Test that one client exhausting its bucket does not affect another"""
+        data = {"username": "testuser", "password": "wrongpassword"}
+        for _ in range(21):
+            self.client.post("/login/", data, REMOTE_ADDR="10.0.0.1")
+
+        response = self.client.post("/login/", data, REMOTE_ADDR="10.0.0.2")
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @mock.patch.object(SharedScopedRateThrottle, "timer", return_value=1000.0)
+    def test_forwarded_for_header_does_not_bypass_throttle(self, timer):
+        """Test that a spoofed X-Forwarded-For does not give a fresh bucket"""
+        data = {"username": "testuser", "password": "wrongpassword"}
+        for index in range(20):
+            self.client.post("/login/", data, HTTP_X_FORWARDED_FOR=f"10.1.0.{index}")
+
+        response = self.client.post("/login/", data, HTTP_X_FORWARDED_FOR="10.1.0.99")
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_tokens_refill_over_time(self):
+        """Test that a drained bucket refills at its configured rate"""
+        store = get_bucket_store()
+        for _ in range(2):
+            store.consume("refill", capacity=2, refill_rate=1, now=100.0)
+
+        allowed, wait = store.consume("refill", capacity=2, refill_rate=1, now=100.5)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 0.5)
+        self.assertTrue(store.consume("refill", capacity=2, refill_rate=1, now=101.6)[0])
+
+    def test_bucket_is_shared_across_processes(self):
+        """Test that concurrent processes never overdraw a shared bucket"""
+        if "fork" not in multiprocessing.get_all_start_methods():
+            self.skipTest("requires the fork start method")
+        context = multiprocessing.get_context("fork")
+        path = os.path.join(throttle_dir.name, "processes.bin")
+        results = context.Queue()
+        processes = [
+            context.Process(target=consume_tokens, args=(path, 50, results))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        allowed = sum(results.get(timeout=60) for _ in processes)
+        for process in processes:
+            process.join()
+
+        self.assertEqual(allowed, 100)
+
+
+class ChangeFeedViewTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="testpass123"
+        )
+        self.other_user = User.objects.create_user(
+            username="other", email="other@example.com", password="testpass123"
+        )
+        self.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="adminpass123",
+            is_staff=True,
+        )
+        self.vehicle = Vehicle.objects.create(
+            make="Toyota", model="Camry", year=2022, plate="ABC-123"
+        )
+        self.booking = Booking.objects.create(
+            vehicle=self.vehicle,
+            user=self.user,
+            start_datetime="2023-12-01T00:00:00Z",
+            end_datetime="2023-12-05T00:00:00Z",
+        )
+        Booking.objects.create(
+            vehicle=self.vehicle,
+            user=self.other_user,
+            start_datetime="2023-12-06T00:00:00Z",
+            end_datetime="2023-12-08T00:00:00Z",
+        )
+        self.client = APIClient()
+
+    def authenticate(self, user):
+        refresh = RefreshToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def test_write_rolls_back_when_change_is_not_recorded(self):
+        """Test that a vehicle is not saved without its Change row"""
+        self.authenticate(self.admin_user)
+
+        with mock.patch.object(
+            Change.objects, "create", side_effect=DatabaseError("disk full")
+        ):
+            with self.assertRaises(DatabaseError):
+                self.client.post(
+                    "/vehicles/",
+                    {"make": "Honda", "model": "Civic", "year": 2021, "plate": "X-1"},
+                )
+
+        self.assertFalse(Vehicle.objects.filter(plate="X-1").exists())
+
+    def test_user_sees_only_own_booking_changes(self):
+        """Test that a regular user only receives changes to their bookings"""
+        self.authenticate(self.user)
+
+        response = self.client.get("/changes/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        changes = response.data["changes"]
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0]["model"], "booking")
+        self.assertEqual(changes[0]["object_id"], self.booking.pk)
+        self.assertEqual(changes[0]["action"], "create")
+
+    def test_admin_sees_vehicle_changes(self):
+        """Test that staff users also receive vehicle changes"""
+        self.authenticate(self.admin_user)
+        self.vehicle.model = "Corolla"
+        self.vehicle.save()
+
+        response = self.client.get("/changes/")
+
+        actions = [(c["model"], c["action"]) for c in response.data["changes"]]
+        self.assertEqual(actions, [("vehicle", "create"), ("vehicle", "update")])
+        self.assertEqual(response.data["changes"][1]["data"]["model"], "Corolla")
+
+    def test_since_and_limit(self):
+        """Test paging through the feed with since and limit"""
+        self.authenticate(self.admin_user)
+        for index in range(3):
+            Vehicle.objects.create(
+                make="Honda", model="Civic", year=2021, plate=f"XYZ-{index}"
+            )
+
+        first = self.client.get("/changes/", {"limit": 2})
+        second = self.client.get(
+            "/changes/", {"since": first.data["next_since"], "limit": 2}
+        )
+
+        self.assertTrue(first.data["has_more"])
+        self.assertFalse(second.data["has_more"])
+        self.assertEqual(len(first.data["changes"]) + len(second.data["changes"]), 4)
+        self.assertLess(
+            first.data["changes"][-1]["seq"], second.data["changes"][0]["seq"]
+        )
+
+    def test_vehicle_delete_records_booking_tombstones(self):
+        """Test that cascade deletes of bookings leave tombstones"""
+        self.authenticate(self.user)
+        since = self.client.get("/changes/").data["next_since"]
+        self.vehicle.delete()
+
+        response = self.client.get("/changes/", {"since": since})
+
+        changes = response.data["changes"]
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0]["object_id"], self.booking.pk)
+        self.assertEqual(changes[0]["action"], "delete")
+        self.assertIsNone(changes[0]["data"])
+
+    def test_invalid_since(self):
+        """Test change feed with an invalid since value"""
+        self.authenticate(self.user)
+
+        response = self.client.get("/changes/", {"since": "abc"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_changes_unauthenticated(self):
+        """Test change feed without authentication"""
+        response = self.client.get("/changes/")
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_compact_changes_keeps_latest_entry(self):
+        """Test that compaction keeps only the latest change per object"""
+        self.vehicle.model = "Corolla"
+        self.vehicle.save()
+
+        call_command("compact_changes", stdout=StringIO())
+
+        vehicle_changes = Change.objects.filter(model=Change.VEHICLE)
+        self.assertEqual(vehicle_changes.count(), 1)
+        self.assertEqual(vehicle_changes.get().action, Change.UPDATE)
+        self.assertEqual(Change.objects.filter(model=Change.BOOKING).count(), 2)
+
+
+class BookingEventsTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="testpass123"
+        )
+        self.other_user = User.objects.create_user(
+            username="other", email="other@example.com", password="testpass123"
+        )
+        self.vehicle = Vehicle.objects.create(
+            make="Toyota", model="Camry", year=2022, plate="ABC-123"
+        )
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.client = APIClient()
+
+    def test_booking_changes_are_published_on_commit(self):
+        """Test that creating and deleting a booking publishes events"""
+        vehicle_id = self.vehicle.pk
+        with mock.patch.object(hub, "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                booking = Booking.objects.create(
+                    vehicle=self.vehicle,
+                    user=self.user,
+                    start_datetime="2023-12-01T00:00:00Z",
+                    end_datetime="2023-12-05T00:00:00Z",
+                )
+            with self.captureOnCommitCallbacks(execute=True):
+                self.vehicle.delete()
+
+        events = [call.args[0] for call in publish.call_args_list]
+        self.assertEqual(
+            events,
+            ["booking.created", "vehicle.availability", "vehicle.deleted"],
+        )
+        for call in publish.call_args_list:
+            self.assertEqual(call.kwargs["user_ids"], {self.user.pk})
+        self.assertEqual(publish.call_args_list[0].args[1]["id"], booking.pk)
+        self.assertEqual(publish.call_args_list[2].args[1], {"vehicle": vehicle_id})
+
+    def test_booking_delete_publishes_availability(self):
+        """Test that deleting a booking on its own publishes per-booking events"""
+        booking = Booking.objects.create(
+            vehicle=self.vehicle,
+            user=self.user,
+            start_datetime="2023-12-01T00:00:00Z",
+            end_datetime="2023-12-05T00:00:00Z",
+        )
+        with mock.patch.object(hub, "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                booking.delete()
+
+        events = [call.args[0] for call in publish.call_args_list]
+        self.assertEqual(events, ["booking.deleted", "vehicle.availability"])
+        self.assertTrue(publish.call_args_list[1].args[1]["available"])
+        self.assertEqual(publish.call_args_list[1].kwargs["user_ids"], {self.user.pk})
+
+    def delete_vehicle(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vehicle.delete()
+
+    @override_settings(SSE_QUEUE_SIZE=5)
+    async def test_vehicle_delete_does_not_reach_unrelated_subscribers(self):
+        """Test that deleting a busy vehicle neither drops nor informs other users"""
+        await Booking.objects.abulk_create(
+            Booking(
+                vehicle=self.vehicle,
+                user=self.other_user,
+                start_datetime=f"2023-12-{day:02d}T00:00:00Z",
+                end_datetime=f"2023-12-{day:02d}T12:00:00Z",
+            )
+            for day in range(1, 8)
+        )
+        response = await self.async_client.get(
+            "/bookings/events/", headers={"authorization": f"Bearer {self.token}"}
+        )
+        stream = aiter(response.streaming_content)
+        await anext(stream)
+
+        await sync_to_async(self.delete_vehicle)()
+        hub.publish("booking.created", {"id": 1}, user_ids={self.user.pk})
+
+        self.assertEqual(
+            await anext(stream), b'event: booking.created\ndata: {"id": 1}\n\n'
+        )
+        await stream.aclose()
+
+    async def test_stream_receives_own_events_only(self):
+        """Test that a subscriber only receives its own booking events"""
+        response = await self.async_client.get(
+            "/bookings/events/", headers={"authorization": f"Bearer {self.token}"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b"retry: 3000\n\n")
+
+        hub.publish("booking.created", {"id": 1}, user_ids={self.other_user.pk})
+        hub.publish("booking.created", {"id": 2}, user_ids={self.user.pk})
+
+        self.assertEqual(
+            await anext(stream), b'event: booking.created\ndata: {"id": 2}\n\n'
+        )
+        await stream.aclose()
+
+    @override_settings(SSE_QUEUE_SIZE=2)
+    async def test_slow_subscriber_is_dropped(self):
+        """Test that a subscriber whose queue overflows is disconnected"""
+        response = await self.async_client.get(
+            "/bookings/events/", headers={"authorization": f"Bearer {self.token}"}
+        )
+        stream = aiter(response.streaming_content)
+        await anext(stream)
+
+        for index in range(3):
+            hub.publish("vehicle.availability", {"vehicle": index})
+        await asyncio.sleep(0)
+
+        self.assertEqual(await anext(stream), b"event: dropped\ndata: {}\n\n")
+        with self.assertRaises(StopAsyncIteration):
+            await anext(stream)
+
+    async def test_stream_unauthenticated(self):
+        """Test opening the event stream without authentication"""
+        response = await self.async_client.get("/bookings/events/")
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stream_requires_asgi(self):
+        """Test that the event stream is refused under WSGI"""
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+        response = self.client.get("/bookings/events/")
+
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+
+class ProfilingTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="testpass123"
+        )
+        self.admin_user = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="adminpass123",
+            is_staff=True,
+        )
+        self.client = APIClient()
+
+    def authenticate(self, user):
+        refresh = RefreshToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def test_staff_header_profiles_request(self):
+        """Test that X-Profile from a staff user stores a profile"""
+        self.authenticate(self.admin_user)
+
+        response = self.client.get("/bookings/", HTTP_X_PROFILE="1")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        profile = RequestProfile.objects.get(pk=response["X-Profile-Id"])
+        self.assertEqual(profile.route, "bookings/")
+        self.assertEqual(profile.status_code, status.HTTP_200_OK)
+        self.assertGreater(profile.query_count, 0)
+        self.assertEqual(len(profile.queries), profile.query_count)
+
+    async def test_staff_header_profiles_async_request(self):
+        """Test that requests through the ASGI handler are profiled too"""
+        refresh = await sync_to_async(RefreshToken.for_user)(self.admin_user)
+
+        response = await self.async_client.get(
+            "/bookings/",
+            headers={
+                "Authorization": f"Bearer {refresh.access_token}",
+                "X-Profile": "1",
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        profile = await RequestProfile.objects.aget(pk=response["X-Profile-Id"])
+        self.assertEqual(profile.route, "bookings/")
+        self.assertGreater(profile.query_count, 0)
+
+    def test_header_ignored_for_regular_user(self):
+        """Test that X-Profile from a non-staff user is ignored"""
+        self.authenticate(self.user)
+
+        response = self.client.get("/bookings/", HTTP_X_PROFILE="1")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(RequestProfile.objects.count(), 0)
+
+    @override_settings(PROFILE_SAMPLE_RATE=1.0, PROFILE_MAX_STORED=2)
+    def test_sampling_keeps_latest_profiles(self):
+        """Test that sampled profiles are capped at PROFILE_MAX_STORED"""
+        self.authenticate(self.user)
+
+        for _ in range(3):
+            self.client.get("/bookings/")
+
+        self.assertEqual(RequestProfile.objects.count(), 2)
+
+    def test_list_and_download_as_admin(self):
+        """Test listing, inspecting and downloading stored profiles"""
+        self.authenticate(self.admin_user)
+        profile_id = self.client.get("/bookings/", HTTP_X_PROFILE="1")["X-Profile-Id"]
+
+        listing = self.client.get("/profiles/")
+        detail = self.client.get(f"/profiles/{profile_id}/")
+        download = self.client.get(f"/profiles/{profile_id}/download/")
+
+        self.assertEqual(listing.status_code, status.HTTP_200_OK)
+        self.assertEqual(listing.data[0]["path"], "/bookings/")
+        self.assertNotIn("queries", listing.data[0])
+        self.assertIn("queries", detail.data)
+        self.assertEqual(download.status_code, status.HTTP_200_OK)
+        with tempfile.NamedTemporaryFile(suffix=".prof") as prof_file:
+            prof_file.write(download.content)
+            prof_file.flush()
+            stats = pstats.Stats(prof_file.name)
+        self.assertGreater(stats.total_calls, 0)
+
+    def test_profiles_as_regular_user(self):
+        """Test listing profiles as regular user (should fail)"""
+        self.authenticate(self.user)
+
+        response = self.client.get("/profiles/")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SeedBenchCommandTest(APITestCase):
+    def test_seed_bench_creates_rows(self):
+        """Test that seed_bench creates the requested rows without overlaps"""
+        call_command(
+            "seed_bench", users=5, vehicles=3, bookings=60, stdout=StringIO()
+        )
+
+        self.assertEqual(User.objects.filter(username__startswith="bench_").count(), 5)
+        self.assertTrue(User.objects.get(username="bench_0").is_staff)
+        self.assertEqual(Vehicle.objects.count(), 3)
+        self.assertEqual(Booking.objects.count(), 60)
+        self.assertEqual(
+            Change.objects.filter(model=Change.VEHICLE, action=Change.CREATE).count(),
+            3,
+        )
+        changes = Change.objects.filter(model=Change.BOOKING, action=Change.CREATE)
+        self.assertEqual(
+            set(changes.values_list("object_id", "user_id")),
+            set(Booking.objects.values_list("pk", "user_id")),
+        )
+        for vehicle in Vehicle.objects.all():
+            bookings = list(vehicle.bookings.order_by("start_datetime"))
+            for previous, following in zip(bookings, bookings[1:]):
+                self.assertLessEqual(previous.end_datetime, following.start_datetime)
+
+    def seeded_rows(self):
+        return (
+            list(Vehicle.objects.order_by("pk").values_list("make", "model", "year")),
+            list(
+                Booking.objects.order_by("pk").values_list(
+                    "vehicle__plate", "start_datetime", "end_datetime"
+                )
+            ),
+        )
+
+    def test_seed_bench_is_deterministic(self):
+        """Test that the same seed produces the same rows at any time"""
+        call_command("seed_bench", users=2, vehicles=5, bookings=20, stdout=StringIO())
+        first = self.seeded_rows()
+        User.objects.all().delete()
+        Vehicle.objects.all().delete()
+
+        later = timezone.now() + timedelta(days=400, hours=5)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            call_command(
+                "seed_bench", users=2, vehicles=5, bookings=20, stdout=StringIO()
+            )
+
+        self.assertEqual(self.seeded_rows(), first)
+
+    def test_seed_bench_refuses_existing_data(self):
+        """Test that seed_bench does not add to an already seeded database"""
+        call_command("seed_bench", users=1, vehicles=1, bookings=0, stdout=StringIO())
+
+        with self.assertRaises(CommandError):
+            call_command(
+                "seed_bench", users=1, vehicles=1, bookings=0, stdout=StringIO()
+            )
+
+
+class BookingAllocateViewTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="testpass123"
+        )
+        self.toyotas = [
+            Vehicle.objects.create(
+                make="Toyota", model="Camry", year=2022, plate=f"TOY-{index}"
+            )
+            for index in range(3)
+        ]
+        self.honda = Vehicle.objects.create(
+            make="Honda", model="Civic", year=2021, plate="HON-1"
+        )
+        self.client = APIClient()
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.window = {
+            "start_datetime": "2023-12-10T00:00:00Z",
+            "end_datetime": "2023-12-15T00:00:00Z",
+        }
+
+    def test_allocate_matching_vehicle(self):
+        """Test that allocation books a free vehicle matching the filters"""
+        response = self.client.post(
+            "/bookings/allocate/", {"make": "Toyota", **self.window}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn(response.data["vehicle"], [v.pk for v in self.toyotas])
+        self.assertEqual(response.data["user"], self.user.pk)
+
+    def test_allocate_skips_booked_vehicles(self):
+        """Test that each allocation for the same window gets a different car"""
+        allocated = set()
+        for _ in range(3):
+            response = self.client.post(
+                "/bookings/allocate/", {"make": "Toyota", **self.window}
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            allocated.add(response.data["vehicle"])
+
+        response = self.client.post(
+            "/bookings/allocate/", {"make": "Toyota", **self.window}
+        )
+
+        self.assertEqual(allocated, {v.pk for v in self.toyotas})
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Booking.objects.count(), 3)
+
+    @override_settings(ALLOCATION_CANDIDATES=1)
+    def test_allocate_retries_after_losing_every_candidate(self):
+        """Test that losing all candidates to other requests re-queries the fleet"""
+        book = BookingAllocateView.book
+        lost = []
+
+        def lose_first(view, user, vehicle_id, start, end):
+            if not lost:
+                lost.append(vehicle_id)
+                return None
+            return book(view, user, vehicle_id, start, end)
+
+        with mock.patch.object(
+            BookingAllocateView, "book", autospec=True, side_effect=lose_first
+        ):
+            response = self.client.post(
+                "/bookings/allocate/", {"make": "Toyota", **self.window}
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotEqual(response.data["vehicle"], lost[0])
+
+    def test_allocate_ignores_non_overlapping_bookings(self):
+        """Test that bookings outside the window do not block a vehicle"""
+        Booking.objects.create(
+            vehicle=self.honda,
+            user=self.user,
+            start_datetime="2023-12-01T00:00:00Z",
+            end_datetime="2023-12-10T00:00:00Z",
+        )
+
+        response = self.client.post(
+            "/bookings/allocate/", {"make": "Honda", "year": 2021, **self.window}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["vehicle"], self.honda.pk)
+
+    def test_allocate_invalid_window(self):
+        """Test allocation with an end time before the start time"""
+        response = self.client.post(
+            "/bookings/allocate/",
+            {
+                "make": "Toyota",
+                "start_datetime": "2023-12-15T00:00:00Z",
+                "end_datetime": "2023-12-10T00:00:00Z",
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_allocate_unauthenticated(self):
+        """Test allocation without authentication"""
+        self.client.credentials()
+
+        response = self.client.post("/bookings/allocate/", self.window)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class BookingListETagTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="testpass123"
+        )
+        self.other_user = User.objects.create_user(
+            username="other", email="other@example.com", password="testpass123"
+        )
+        self.vehicle = Vehicle.objects.create(
+            make="Toyota", model="Camry", year=2022, plate="ABC-123"
+        )
+        Booking.objects.create(
+            vehicle=self.vehicle,
+            user=self.user,
+            start_datetime="2023-12-01T00:00:00Z",
+            end_datetime="2023-12-05T00:00:00Z",
+        )
+        BookingListCreateView.cache.clear()
+        self.client = APIClient()
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def tearDown(self):
+        BookingListCreateView.cache.clear()
+
+    def test_matching_etag_returns_not_modified(self):
+        """Test that If-None-Match with the current ETag skips the list query"""
+        etag = self.client.get("/bookings/")["ETag"]
+
+        # Only the user lookup and the version lookup run.
+        with self.assertNumQueries(2):
+            response = self.client.get("/bookings/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_unchanged_list_is_served_from_cache(self):
+        """Test that a repeated GET reuses the cached serialized list"""
+        first = self.client.get("/bookings/")
+
+        with self.assertNumQueries(2):
+            second = self.client.get("/bookings/")
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(len(second.json()), 1)
+
+    def test_new_booking_changes_etag(self):
+        """Test that creating a booking invalidates the previous ETag"""
+        etag = self.client.get("/bookings/")["ETag"]
+        self.client.post(
+            "/bookings/",
+            {
+                "vehicle": self.vehicle.pk,
+                "start_datetime": "2023-12-10T00:00:00Z",
+                "end_datetime": "2023-12-15T00:00:00Z",
+            },
+        )
+
+        response = self.client.get("/bookings/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.json()), 2)
+
+    def test_vehicle_delete_changes_etag(self):
+        """Test that cascade deletes from a vehicle delete change the ETag"""
+        etag = self.client.get("/bookings/")["ETag"]
+        self.vehicle.delete()
+
+        response = self.client.get("/bookings/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 0)
+
+    def test_other_users_bookings_keep_etag(self):
+        """Test that another user's bookings do not change this user's ETag"""
+        etag = self.client.get("/bookings/")["ETag"]
+        Booking.objects.create(
+            vehicle=self.vehicle,
+            user=self.other_user,
+            start_datetime="2023-12-10T00:00:00Z",
+            end_datetime="2023-12-15T00:00:00Z",
+        )
+
+        response = self.client.get("/bookings/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_cache_is_bounded_by_size(self):
+        """Test that the list cache evicts entries beyond its byte budget"""
+        cache = LRUCache(max_bytes=10)
+        cache.set("a", b"12345")
+        cache.set("b", b"12345")
+        cache.get("a")
+        cache.set("c", b"123")
+
+        self.assertEqual(cache.get("a"), b"12345")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["bytes"], 8)
+        cache.set("d", b"x" * 11)
+        self.assertIsNone(cache.get("d"))
@@ -0,0 +1,158 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import ScopedRateThrottle
+
+try:
+    import fcntl
+except ImportError:  # Windows: buckets are only shared between threads.
+    fcntl = None
+
+
+class SharedBucketStore:
+    """
+    Token buckets kept in an mmap'd file so every worker process on a host
+    shares the same counters. Each slot holds a key hash, the remaining tokens
+    and the time of the last refill; lookups probe a few neighbouring slots and
+    evict the stalest one when they are all taken.
+    """
+
+    slot = struct.Struct("<Qdd")
+    probes = 8
+
+    def __init__(self, path, slots=65536):
+        self.path = str(path)
+        self.slots = slots
+        self.size = slots * self.slot.size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._map = None
+
+    def _open(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        # Reopen after a fork: flock only excludes separate open files.
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(fd).st_size < self.size:
+            os.ftruncate(fd, self.size)
+        self._fd = fd
+        self._map = mmap.mmap(fd, self.size)
+        self._pid = pid
+
+    def _find(self, key_hash):
+        start = key_hash % self.slots
+        victim = None
+        victim_updated = None
+        for probe in range(self.probes):
+            offset = ((start + probe) % self.slots) * self.slot.size
+            stored_hash, tokens, updated = self.slot.unpack_from(self._map, offset)
+            if stored_hash == key_hash:
+                return offset, tokens, updated
+            if stored_hash == 0:
+                return offset, None, None
+            if victim is None or updated < victim_updated:
+                victim, victim_updated = offset, updated
+        return victim, None, None
+
+    @staticmethod
+    def hash_key(key):
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little") or 1
+
+    def consume(self, key, capacity, refill_rate, now=None):
+        """
+        Take one token from the bucket for ``key``. Returns a tuple of
+        whether a token was available and the seconds until the next one.
+        """
+        key_hash = self.hash_key(key)
+        with self._lock:
+            self._open()
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if now is None:
+                    now = time.time()
+                offset, tokens, updated = self._find(key_hash)
+                if tokens is None:
+                    tokens = float(capacity)
+                else:
+                    tokens = min(capacity, tokens + (now - updated) * refill_rate)
+                allowed = tokens >= 1
+                if allowed:
+                    tokens -= 1
+                self.slot.pack_into(self._map, offset, key_hash, tokens, now)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        if allowed or refill_rate <= 0:
+            return allowed, None
+        return allowed, (1 - tokens) / refill_rate
+
+    def reset(self):
+        with self._lock:
+            self._open()
+            self._map[:] = bytes(self.size)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_bucket_store():
+    path = getattr(
+        settings,
+        "THROTTLE_SHARED_FILE",
+        os.path.join(tempfile.gettempdir(), "sample_drf_throttle.bin"),
+    )
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = SharedBucketStore(
+                path, getattr(settings, "THROTTLE_SHARED_SLOTS", 65536)
+            )
+        return _stores[path]
+
+
+class SharedScopedRateThrottle(ScopedRateThrottle):
+    """
+    Token-bucket throttle for views that set ``throttle_scope``. Buckets are
+    kept per scope and per user, or per client IP for anonymous requests, and
+    are shared by all workers on the host through ``SharedBucketStore``.
+    """
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+
+        # Read per request rather than at import, so rate changes apply.
+        self.THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        if self.rate is None:
+            return True
+
+        if request.user and request.user.is_authenticated:
+            ident = f"user:{request.user.pk}"
+        else:
+            ident = f"ip:{self.get_ident(request)}"
+
+        allowed, self.retry_after = get_bucket_store().consume(
+            self.cache_format % {"scope": self.scope, "ident": ident},
+            self.num_requests,
+            self.num_requests / self.duration,
+            now=self.timer(),
+        )
+        return allowed
+
+    def wait(self):
+        return self.retry_after
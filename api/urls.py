@@ -1,13 +1,42 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
 
-from .views import BookingListCreateView, LoginView, RegisterView, VehicleView
+from .views import (
+    BatchView,
+    BookingAllocateView,
+    BookingEventsView,
+    BookingListCreateView,
+    ChangeFeedView,
+    LoginView,
+    RegisterView,
+    RequestProfileDetailView,
+    RequestProfileDownloadView,
+    RequestProfileListView,
+    VehicleView,
+)
 
 urlpatterns = [
     path("vehicles/", VehicleView.as_view(), name="vehicle-list"),
     path("vehicles/<int:pk>/", VehicleView.as_view(), name="vehicle-detail"),
     path("bookings/", BookingListCreateView.as_view(), name="booking-list-create"),
+    path(
+        "bookings/allocate/", BookingAllocateView.as_view(), name="booking-allocate"
+    ),
+    path("bookings/events/", BookingEventsView.as_view(), name="booking-events"),
+    path("changes/", ChangeFeedView.as_view(), name="change-feed"),
+    path("profiles/", RequestProfileListView.as_view(), name="profile-list"),
+    path(
+        "profiles/<int:pk>/",
+        RequestProfileDetailView.as_view(),
+        name="profile-detail",
+    ),
+    path(
+        "profiles/<int:pk>/download/",
+        RequestProfileDownloadView.as_view(),
+        name="profile-download",
+    ),
     path("register/", RegisterView.as_view(), name="register"),
     path("login/", LoginView.as_view(), name="login"),
     path("refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("batch/", BatchView.as_view(), name="batch"),
 ]
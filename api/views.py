@@ -1,15 +1,43 @@
+import json
+import random
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+
+from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections, transaction
+from django.db.models import Exists, Max, OuterRef, Q
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import Resolver404, resolve
+from django.utils.http import parse_etags
 from rest_framework import generics, permissions, status
 from rest_framework.generics import ListCreateAPIView
 from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from .models import Booking, Vehicle
-from .serializers import BookingSerializer, RegisterSerializer, VehicleSerializer
+from .authentication import ForwardedAuthentication
+from .caching import LRUCache
+from .events import event_stream
+from .models import Booking, Change, RequestProfile, Vehicle
+from .serializers import (
+    AllocationSerializer,
+    BatchSerializer,
+    BookingSerializer,
+    ChangeQuerySerializer,
+    ChangeSerializer,
+    RegisterSerializer,
+    RequestProfileDetailSerializer,
+    RequestProfileSerializer,
+    VehicleSerializer,
+)
 
 
 class VehicleView(APIView):
@@ -27,7 +55,9 @@ class VehicleView(APIView):
     def post(self, request):
         serializer = VehicleSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            # The vehicle and its Change row commit together.
+            with transaction.atomic():
+                serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -35,35 +65,226 @@ class VehicleView(APIView):
         vehicle = get_object_or_404(Vehicle, pk=pk)
         serializer = VehicleSerializer(vehicle, data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request, pk):
         vehicle = get_object_or_404(Vehicle, pk=pk)
-        vehicle.delete()
+        with transaction.atomic():
+            vehicle.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class BookingListCreateView(ListCreateAPIView):
     serializer_class = BookingSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "bookings"
+    cache = LRUCache(
+        max_bytes=getattr(settings, "BOOKING_LIST_CACHE_BYTES", 8 * 1024 * 1024)
+    )
 
     def get_queryset(self):
         return Booking.objects.filter(user=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        # Every change to a user's bookings, including cascade deletes, adds a
+        # Change row for that user, so the latest one versions the list.
+        latest = (
+            Change.objects.filter(user=request.user)
+            .order_by("-seq")
+            .values_list("seq", "created_at")
+            .first()
+        ) or (0, None)
+        etag = f'"{request.user.pk}-{latest[0]}-{request.accepted_renderer.format}"'
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        if {"*", etag} & {tag.removeprefix("W/") for tag in if_none_match}:
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+            )
+
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, JSONRenderer):
+            # Browsable API pages embed per-request forms, so are not cached.
+            data = self.get_serializer(self.get_queryset(), many=True).data
+            return Response(data, headers={"ETag": etag})
+
+        key = (request.user.pk, *latest, request.accepted_media_type)
+        content = self.cache.get(key)
+        if content is None:
+            data = self.get_serializer(self.get_queryset(), many=True).data
+            content = renderer.render(
+                data, request.accepted_media_type, self.get_renderer_context()
+            )
+            self.cache.set(key, content)
+        return HttpResponse(
+            content, content_type=renderer.media_type, headers={"ETag": etag}
+        )
+
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        with transaction.atomic():
+            serializer.save(user=self.request.user)
+
+
+class BookingAllocateView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "bookings"
+
+    def post(self, request):
+        serializer = AllocationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        start, end = data["start_datetime"], data["end_datetime"]
+        filters = {key: data[key] for key in ("make", "model", "year") if key in data}
+        # Start from a random vehicle and wrap around, so concurrent
+        # allocations spread over the fleet instead of all racing for the
+        # lowest id.
+        max_pk = Vehicle.objects.aggregate(max_pk=Max("pk"))["max_pk"]
+        pivot = random.randint(1, max_pk) if max_pk is not None else None
+        lost = []
+        while pivot is not None and (
+            candidates := self.free_vehicle_ids(filters, start, end, pivot, lost)
+        ):
+            for vehicle_id in candidates:
+                booking = self.book(request.user, vehicle_id, start, end)
+                if booking is not None:
+                    return Response(
+                        BookingSerializer(booking).data, status=status.HTTP_201_CREATED
+                    )
+                lost.append(vehicle_id)
+        return Response(
+            {"detail": "No matching vehicle is free for that time."},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    def free_vehicle_ids(self, filters, start, end, pivot, exclude):
+        limit = getattr(settings, "ALLOCATION_CANDIDATES", 5)
+        overlapping = Booking.objects.filter(
+            vehicle=OuterRef("pk"), start_datetime__lt=end, end_datetime__gt=start
+        )
+        free = (
+            Vehicle.objects.filter(~Exists(overlapping), **filters)
+            .exclude(pk__in=exclude)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        vehicle_ids = list(free.filter(pk__gte=pivot)[:limit])
+        if len(vehicle_ids) < limit:
+            vehicle_ids += free.filter(pk__lt=pivot)[: limit - len(vehicle_ids)]
+        return vehicle_ids
+
+    def book(self, user, vehicle_id, start, end):
+        # Insert first, then lock the vehicle and look for a competing
+        # booking, so two allocations can never both keep the same car.
+        with transaction.atomic():
+            booking = Booking.objects.create(
+                user=user,
+                vehicle_id=vehicle_id,
+                start_datetime=start,
+                end_datetime=end,
+            )
+            vehicle_exists = (
+                Vehicle.objects.select_for_update().filter(pk=vehicle_id).exists()
+            )
+            conflict = (
+                Booking.objects.filter(
+                    vehicle_id=vehicle_id,
+                    start_datetime__lt=end,
+                    end_datetime__gt=start,
+                )
+                .exclude(pk=booking.pk)
+                .exists()
+            )
+            if not vehicle_exists or conflict:
+                transaction.set_rollback(True)
+                return None
+        return booking
+
+
+class BookingEventsView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def perform_content_negotiation(self, request, force=False):
+        # EventSource sends Accept: text/event-stream; render errors as JSON anyway.
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        if not isinstance(request._request, ASGIRequest):
+            return Response(
+                {"detail": "Event streams require an ASGI server."},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        response = StreamingHttpResponse(
+            event_stream(request.user), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+class ChangeFeedView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        query = ChangeQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response(query.errors, status=status.HTTP_400_BAD_REQUEST)
+        since = query.validated_data["since"]
+        limit = query.validated_data["limit"]
+
+        visible = Q(model=Change.BOOKING, user=request.user)
+        if request.user.is_staff:
+            visible |= Q(model=Change.VEHICLE)
+        changes = list(Change.objects.filter(visible, seq__gt=since)[: limit + 1])
+
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        return Response(
+            {
+                "changes": ChangeSerializer(changes, many=True).data,
+                "next_since": changes[-1].seq if changes else since,
+                "has_more": has_more,
+            }
+        )
+
+
+class RequestProfileListView(generics.ListAPIView):
+    queryset = RequestProfile.objects.defer("queries", "stats")
+    permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+    serializer_class = RequestProfileSerializer
+
+
+class RequestProfileDetailView(generics.RetrieveAPIView):
+    queryset = RequestProfile.objects.defer("stats")
+    permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+    serializer_class = RequestProfileDetailSerializer
+
+
+class RequestProfileDownloadView(APIView):
+    permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
+
+    def get(self, request, pk):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(
+            bytes(profile.stats), content_type="application/octet-stream"
+        )
+        response["Content-Disposition"] = f'attachment; filename="profile-{pk}.prof"'
+        return response
 
 
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = [AllowAny]
+    throttle_scope = "register"
     serializer_class = RegisterSerializer
 
 
 class LoginView(APIView):
     permission_classes = [AllowAny]
+    throttle_scope = "login"
 
     def post(self, request):
         username = request.data.get("username")
@@ -81,3 +302,117 @@ class LoginView(APIView):
         return Response(
             {"detail": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED
         )
+
+
+class BatchView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "batch"
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        operations = serializer.validated_data["operations"]
+        if serializer.validated_data["atomic"]:
+            results = self.run_atomic(request, operations)
+        else:
+            results = self.run_concurrent(request, operations)
+        return Response(results)
+
+    def run_atomic(self, request, operations):
+        results = []
+        with transaction.atomic():
+            for operation in operations:
+                result = self.run_operation(request, operation)
+                results.append(result)
+                if result["status"] >= 400:
+                    transaction.set_rollback(True)
+                    break
+        skipped = {
+            "status": status.HTTP_424_FAILED_DEPENDENCY,
+            "body": {"detail": "Not run because an earlier operation failed."},
+        }
+        return results + [skipped] * (len(operations) - len(results))
+
+    def run_concurrent(self, request, operations):
+        # Consecutive GETs run in parallel; writes run alone and in order.
+        results = []
+        reads = []
+        for operation in operations:
+            if operation["method"] == "GET":
+                reads.append(operation)
+                continue
+            results.extend(self.run_reads(request, reads))
+            reads = []
+            results.append(self.run_operation(request, operation))
+        results.extend(self.run_reads(request, reads))
+        return results
+
+    def run_reads(self, request, operations):
+        max_workers = min(getattr(settings, "BATCH_MAX_WORKERS", 4), len(operations))
+        if max_workers <= 1:
+            return [self.run_operation(request, operation) for operation in operations]
+
+        def run_in_thread(operation):
+            try:
+                return self.run_operation(request, operation)
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(run_in_thread, operations))
+
+    def run_operation(self, request, operation):
+        path, _, query_string = operation["path"].partition("?")
+        try:
+            match = resolve(path, urlconf="api.urls")
+        except Resolver404:
+            return {"status": status.HTTP_404_NOT_FOUND, "body": {"detail": "Not found."}}
+        if match.func.view_class is BatchView:
+            return {
+                "status": status.HTTP_400_BAD_REQUEST,
+                "body": {"detail": "Batch requests cannot be nested."},
+            }
+
+        # Reuse the batch request's authentication instead of re-verifying the JWT.
+        view = match.func.view_class.as_view(
+            **{
+                **match.func.view_initkwargs,
+                "authentication_classes": [
+                    partial(ForwardedAuthentication, request.user, request.auth)
+                ],
+            }
+        )
+        sub_request = self.build_request(request, operation, path, query_string)
+        sub_request.resolver_match = match
+        response = view(sub_request, *match.args, **match.kwargs)
+        if isinstance(response, Response):
+            body = response.data
+        elif response.get("Content-Type") == "application/json":
+            # Views may answer with pre-rendered JSON from a cache.
+            body = json.loads(response.content)
+        else:
+            body = None
+        return {"status": response.status_code, "body": body}
+
+    def build_request(self, request, operation, path, query_string):
+        body = b""
+        if operation["method"] != "GET":
+            body = json.dumps(operation["body"]).encode()
+        return WSGIRequest(
+            {
+                "REQUEST_METHOD": operation["method"],
+                "PATH_INFO": path,
+                "QUERY_STRING": query_string,
+                "SCRIPT_NAME": "",
+                "SERVER_NAME": request.META.get("SERVER_NAME", "localhost"),
+                "SERVER_PORT": request.META.get("SERVER_PORT", "80"),
+                "HTTP_HOST": request.META.get("HTTP_HOST", ""),
+                "REMOTE_ADDR": request.META.get("REMOTE_ADDR", ""),
+                "CONTENT_TYPE": "application/json",
+                "CONTENT_LENGTH": str(len(body)),
+                "wsgi.input": BytesIO(body),
+                "wsgi.url_scheme": request.scheme,
+            }
+        )
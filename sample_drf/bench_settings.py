@@ -0,0 +1,25 @@
+"""
+Settings for load benchmarks.
+
+Uses a separate database so seeded data never touches db.sqlite3, and turns
+off DEBUG and throttling so they do not distort the measurements.
+
+    python manage.py seed_bench --settings sample_drf.bench_settings
+    python manage.py run_bench --settings sample_drf.bench_settings
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, REST_FRAMEWORK
+
+DEBUG = False
+
+ALLOWED_HOSTS = ["127.0.0.1", "localhost"]
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "bench.sqlite3",
+    }
+}
+
+REST_FRAMEWORK = {**REST_FRAMEWORK, "DEFAULT_THROTTLE_CLASSES": ()}
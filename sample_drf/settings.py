@@ -49,6 +49,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "sample_drf.urls"
@@ -125,6 +126,36 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    )
+        "api.authentication.CachedJWTAuthentication",
+    ),
+    "DEFAULT_THROTTLE_CLASSES": ("api.throttling.SharedScopedRateThrottle",),
+    # Key anonymous buckets on REMOTE_ADDR, not a client-supplied
+    # X-Forwarded-For. Set to the number of trusted proxies behind one.
+    "NUM_PROXIES": 0,
+    "DEFAULT_THROTTLE_RATES": {
+        "login": "20/min",
+        "register": "10/min",
+        "bookings": "120/min",
+        "batch": "60/min",
+    },
 }
+
+JWT_TOKEN_CACHE_SIZE = 1024
+
+BATCH_MAX_OPERATIONS = 20
+
+BATCH_MAX_WORKERS = 4
+
+THROTTLE_SHARED_SLOTS = 65536
+
+SSE_QUEUE_SIZE = 100
+
+SSE_HEARTBEAT_SECONDS = 15
+
+PROFILE_SAMPLE_RATE = 0.0
+
+PROFILE_MAX_STORED = 100
+
+ALLOCATION_CANDIDATES = 5
+
+BOOKING_LIST_CACHE_BYTES = 8 * 1024 * 1024